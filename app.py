@@ -9,14 +9,20 @@ Fixed issues:
 4. Batched OpenAI translation to avoid 429 errors
 """
 import io
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
 import streamlit as st
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import easyocr
+from easyocr.utils import reformat_input
 from typing import List, Tuple
 
-from ocr_utils import box_to_rect, sort_reading_order, merge_nearby_boxes
-from translate_utils import translate_batch
+from ocr_utils import OCRPage, detect_device, prefer_openvino
+from translate_utils import translate_batch, detect_batch_language
 from export_utils import export_json, export_csv
 from daytona_runner import run_in_daytona, reset_sandbox
 
@@ -52,6 +58,26 @@ def safe_easyocr_lang_list(primary: str) -> List[str]:
     return [primary if primary else "en"]
 
 
+# Fixed model directory populated by prefetch_models.py (None = EasyOCR default)
+EASYOCR_MODEL_DIR = os.environ.get("EASYOCR_MODEL_DIR") or None
+
+
+def _create_reader(langs: List[str], use_gpu: bool):
+    """Instantiate an EasyOCR reader, using the OpenVINO backend on CPU when possible"""
+    kwargs = {
+        "model_storage_directory": EASYOCR_MODEL_DIR,
+        "user_network_directory": EASYOCR_MODEL_DIR,
+    }
+    if not use_gpu and prefer_openvino():
+        try:
+            return easyocr.Reader(langs, gpu=False, backend="openvino", **kwargs)
+        except TypeError:
+            # Stock EasyOCR builds have no `backend` argument
+            pass
+    # cuDNN autotuning pays off since downscaled pages mostly share a resolution
+    return easyocr.Reader(langs, gpu=use_gpu, cudnn_benchmark=use_gpu, **kwargs)
+
+
 @st.cache_resource(show_spinner=False)
 def get_easyocr_reader(langs: Tuple[str, ...]):
     """
@@ -59,8 +85,37 @@ def get_easyocr_reader(langs: Tuple[str, ...]):
     Uses tuple for hashability (required by cache_resource).
     
     IMPORTANT: This prevents repeated 100-500MB downloads on every Streamlit rerun!
+
+    Uses CUDA/MPS when available and falls back to CPU if GPU init fails (e.g. OOM).
+    On CPU, the OpenVINO backend is used when installed (converted once per language tuple).
+    EasyOCR already int8-quantizes the models on CPU (Reader(quantize=True) is its default).
     """
-    return easyocr.Reader(list(langs), gpu=False)
+    use_gpu = detect_device() != "cpu"
+    try:
+        reader = _create_reader(list(langs), use_gpu)
+    except RuntimeError:
+        if not use_gpu:
+            raise
+        print(f"[OCR] GPU reader init failed for {langs}, falling back to CPU")
+        return _create_reader(list(langs), False)
+
+    # Warm up GPU kernels once so the first real page isn't the slow one
+    if use_gpu:
+        reader.readtext(np.zeros((64, 64, 3), dtype=np.uint8))
+    return reader
+
+
+def downscale_for_ocr(img: Image.Image, max_side: int) -> Tuple[Image.Image, float]:
+    """
+    Shrink the image so its long edge is at most max_side pixels.
+    Returns (ocr_image, inverse_scale) - multiply OCR box coordinates by
+    inverse_scale to map them back onto the original image.
+    """
+    w, h = img.size
+    s = min(1.0, max_side / float(max(w, h))) if max_side else 1.0
+    if s >= 1.0:
+        return img, 1.0
+    return img.resize((max(1, int(w * s)), max(1, int(h * s))), Image.LANCZOS), 1.0 / s
 
 
 def run_ocr(img_np: np.ndarray, primary_lang: str):
@@ -82,7 +137,11 @@ def run_ocr_auto(img_np: np.ndarray):
       Example: for Japanese you must use ["ja","en"], not ["ja","ko","en",...].
 
     Strategy:
-    - Try a few SAFE language configurations one-by-one.
+    - Run text detection (CRAFT) ONCE - it is the same model for every language,
+      so candidates only re-run recognition on the detected regions.
+    - Probe with the Japanese reader first and classify the script of what it read:
+      kana means Japanese (done in one pass), kanji-only is checked against Chinese.
+    - Otherwise try a few SAFE language configurations (concurrently, one reader per thread).
     - Score the OCR results and pick the best.
     """
     def _clean(raw):
@@ -102,52 +161,175 @@ def run_ocr_auto(img_np: np.ndarray):
         # Weight both count and confidence
         return len(raw) * avg_conf
 
-    # Most manga pages: Japanese or Chinese. Keep the list short to reduce downloads.
-    candidates = ["ja", "ch_sim", "ko", "en", "ar", "fr", "ch_tra"]
+    # Shared detection pass
+    regions = None
+    try:
+        det_reader = get_easyocr_reader(tuple(safe_easyocr_lang_list("ja")))
+        img_rgb, img_grey = reformat_input(img_np)
+        horizontal_list, free_list = det_reader.detect(img_rgb)
+        regions = (img_grey, horizontal_list[0], free_list[0])
+    except Exception as e:
+        print(f"[OCR] Shared detection failed, running full readtext per language: {e}")
+
+    def _recognize(reader):
+        if regions is None:
+            return reader.readtext(img_np)
+        img_grey, horizontal, free = regions
+        return reader.recognize(img_grey, horizontal, free)
+
+    def _run(primary):
+        raw = _recognize(get_easyocr_reader(tuple(safe_easyocr_lang_list(primary))))
+        return {"lang": primary, "raw": raw, "score": _score(raw)}
+
+    def _strong(result):
+        # Same bar as the sweep's early exit
+        return result["score"] >= 6.0 and len(_clean(result["raw"])) >= 8
+
+    # Fast path: one probe pass, then pick the script family from the recognized text.
+    # Only a strong probe is trusted - a weak one (or a few misread glyphs) goes to the sweep.
+    probe = None
+    try:
+        probe = _run("ja")
+    except Exception:
+        pass
+
+    if probe is not None and _strong(probe):
+        probe_items = [{"text": t} for _, t, _ in _clean(probe["raw"])]
+        script = detect_batch_language(probe_items)
+        # Kana must be in most boxes, not just somewhere on the page
+        kana_boxes = sum(1 for it in probe_items if detect_batch_language([it]) == "ja")
+        if script == "ja" and kana_boxes * 2 > len(probe_items):
+            return probe["lang"], probe["raw"]
+        if script == "ch_sim":
+            # Kanji without kana: could be Chinese, compare with the Chinese reader
+            try:
+                zh = _run("ch_sim")
+            except Exception:
+                zh = None
+            best = zh if zh is not None and zh["score"] > probe["score"] else probe
+            return best["lang"], best["raw"]
+
+    # Slow path: full candidate sweep
+    candidates = ["ch_sim", "ko", "en", "ar", "fr", "ch_tra"]
+
+    # Warm the reader cache on the main thread first: model downloads and
+    # st.cache_resource should not race each other from worker threads.
+    readers = {}
+    for primary in candidates:
+        try:
+            readers[primary] = get_easyocr_reader(tuple(safe_easyocr_lang_list(primary)))
+        except Exception:
+            continue
+
+    def _score_lang(primary, reader):
+        raw = _recognize(reader)
+        return primary, raw, _score(raw)
 
+    # The sweep starts from an empty baseline: a strong-but-rejected probe must
+    # not trip the early exit below, it only competes once the sweep is done
     best = {"lang": "en", "raw": [], "score": 0.0}
 
-    for primary in candidates:
-        langs = tuple(safe_easyocr_lang_list(primary))
+    # Recognition spends most of its time in Torch kernels (GIL released),
+    # so the candidate passes overlap well on threads.
+    with ThreadPoolExecutor(max_workers=max(1, min(4, len(readers)))) as ex:
+        futures = [ex.submit(_score_lang, p, r) for p, r in readers.items()]
+        for fut in as_completed(futures):
+            try:
+                primary, raw, s = fut.result()
+            except Exception:
+                continue
+
+            if s > best["score"]:
+                best = {"lang": primary, "raw": raw, "score": s}
+
+            # Early exit if we already got a strong result: skip the passes
+            # that have not started yet
+            if _strong(best):
+                for f in futures:
+                    f.cancel()
+                break
+
+    # Leaving the with block waited for the passes that were already running;
+    # score all of them (in candidate order) so the pick doesn't depend on
+    # which thread finished first
+    for fut in futures:
+        if fut.cancelled():
+            continue
         try:
-            reader = get_easyocr_reader(langs)
-            raw = reader.readtext(img_np)
+            primary, raw, s = fut.result()
         except Exception:
             continue
-
-        s = _score(raw)
         if s > best["score"]:
             best = {"lang": primary, "raw": raw, "score": s}
 
-        # Early exit if we already got a strong result
-        if best["score"] >= 6.0 and len(_clean(best["raw"])) >= 8:
-            break
+    if probe is not None and probe["score"] > best["score"]:
+        best = probe
 
     # If best language is English but the content is clearly non-English, it's still OK:
     # translation can run with src="auto" or src=best["lang"] depending on backend.
     return best["lang"], best["raw"]
 
-def draw_numbered_boxes(img: Image.Image, items: list) -> Image.Image:
-    """Draw numbered red boxes on image"""
-    out = img.convert("RGB").copy()
-    draw = ImageDraw.Draw(out)
-    
+
+# ============================================================================
+# Drawing
+# ============================================================================
+
+BOX_COLOR = (255, 0, 0)
+LABEL_TEXT_COLOR = (255, 255, 255)
+LABEL_FONT_PATH = "DejaVuSans.ttf"
+LABEL_FONT_SIZE = 22
+
+# Pixel value written by the NumPy box painter
+_BOX_RGB = np.array(BOX_COLOR, dtype=np.uint8)
+
+
+@lru_cache(maxsize=8)
+def _load_font(path: str = LABEL_FONT_PATH, size: int = LABEL_FONT_SIZE):
+    """Load a font once per (path, size) (TTF parsing is not free)"""
     try:
-        font = ImageFont.truetype("DejaVuSans.ttf", 22)
-    except Exception:
-        font = ImageFont.load_default()
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default()
 
-    for item in items:
-        i = item["index"]
-        box = item["box"]
-        x1, y1, x2, y2 = box_to_rect(box)
 
-        # Red rectangle
-        draw.rectangle([x1, y1, x2, y2], outline=(255, 0, 0), width=3)
-        # Red label background
-        draw.rectangle([x1, y1, x1 + 36, y1 + 30], fill=(255, 0, 0))
-        # White number
-        draw.text((x1 + 7, y1 + 3), str(i), fill=(255, 255, 255), font=font)
+def draw_numbered_boxes(img: Image.Image, page: OCRPage) -> Image.Image:
+    """
+    Draw numbered red boxes on image (numbers follow the page order, starting at 1).
+    Box outlines and label backgrounds are painted straight into a NumPy array:
+    all fill rectangles are computed and clipped in one vectorized pass, then
+    written with plain slice assignments. PIL is only used for the label digits.
+    """
+    arr = np.array(img.convert("RGB"))
+    h, w = arr.shape[:2]
+
+    rects = page.rects.tolist()
+    if rects:
+        # Same truncation PIL applies to float coordinates
+        x1, y1, x2, y2 = page.rects.astype(np.int64).T
+
+        # Five inclusive PIL-style rectangles per box: 3px border sides + label background
+        fills = np.stack([
+            np.stack([x1, y1, x2, np.minimum(y1 + 2, y2)], axis=1),
+            np.stack([x1, np.maximum(y2 - 2, y1), x2, y2], axis=1),
+            np.stack([x1, y1, np.minimum(x1 + 2, x2), y2], axis=1),
+            np.stack([np.maximum(x2 - 2, x1), y1, x2, y2], axis=1),
+            np.stack([x1, y1, x1 + 36, y1 + 30], axis=1),
+        ]).reshape(-1, 4)
+
+        # Half-open slice bounds, clipped to the image
+        fills[:, 2:] += 1
+        fills = np.clip(fills, 0, [w, h, w, h])
+
+        for x_lo, y_lo, x_hi, y_hi in fills.tolist():
+            arr[y_lo:y_hi, x_lo:x_hi] = _BOX_RGB
+
+    out = Image.fromarray(arr)
+    draw = ImageDraw.Draw(out)
+    font = _load_font()
+
+    # White number
+    for i, (x1, y1, _, _) in enumerate(rects, start=1):
+        draw.text((x1 + 7, y1 + 3), str(i), fill=LABEL_TEXT_COLOR, font=font)
 
     return out
 
@@ -156,63 +338,121 @@ def draw_numbered_boxes(img: Image.Image, items: list) -> Image.Image:
 # Local Processing
 # ============================================================================
 
+@st.cache_data(show_spinner=False)
+def run_ocr_cached(img_bytes: bytes, ocr_lang: str, ocr_max_side: int):
+    """
+    OCR keyed on the uploaded file bytes, so reruns on the same image
+    (re-clicking Process, tweaking confidence/merge) skip OCR entirely.
+    Returns (detected_lang, raw_results, inv_scale)
+    """
+    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+
+    # Large scans are downscaled for OCR (detection cost grows with H*W),
+    # boxes are scaled back to original coordinates by the caller
+    ocr_img, inv_scale = downscale_for_ocr(img, ocr_max_side)
+    # Read-only view of the pixels, shared by every OCR pass (no extra H*W*3 copy)
+    img_np = np.asarray(ocr_img)
+
+    if ocr_lang == "auto":
+        detected_lang, raw_results = run_ocr_auto(img_np)
+    else:
+        raw_results = run_ocr(img_np, ocr_lang)
+        detected_lang = ocr_lang
+
+    return detected_lang, raw_results, inv_scale
+
+
+def translate_with_preview(
+    items: list,
+    detected_lang: str,
+    target_lang: str,
+    backend: str,
+    openai_key: str,
+    openai_model: str
+) -> list:
+    """
+    Run translate_batch on a worker thread and show streamed OpenAI translations
+    as they arrive. Worker threads only push (text, translation) pairs onto a
+    queue; the Streamlit placeholder is updated here, on the script thread.
+    """
+    updates = queue.Queue()
+    indices = {}
+    for item in items:
+        indices.setdefault(item["text"], []).append(item["index"])
+    
+    preview = st.empty()
+    shown = {}
+    
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        future = ex.submit(
+            translate_batch,
+            items,
+            detected_lang,
+            target_lang,
+            backend,
+            openai_key,
+            openai_model,
+            on_translation=lambda text, translation: updates.put((text, translation))
+        )
+        while not (future.done() and updates.empty()):
+            try:
+                arrived = [updates.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            # Take everything that is already waiting, then redraw once
+            while not updates.empty():
+                arrived.append(updates.get_nowait())
+            for text, translation in arrived:
+                for idx in indices.get(text, ()):
+                    shown[idx] = translation
+            preview.markdown("\n\n".join(f"**#{idx}** {shown[idx]}" for idx in sorted(shown)))
+    
+    preview.empty()
+    return future.result()
+
+
 def process_local(
     img: Image.Image,
+    img_bytes: bytes,
     ocr_lang: str,
     target_lang: str,
     backend: str,
     min_conf: float,
     merge_lines: bool,
     openai_key: str = "",
-    openai_model: str = "gpt-4o-mini"
+    openai_model: str = "gpt-4o-mini",
+    ocr_max_side: int = 1600
 ):
     """Process image locally with safe EasyOCR handling"""
     
-    img_np = np.array(img.convert("RGB"))
-    
-    # OCR - handle auto vs manual language selection
+    # OCR - handle auto vs manual language selection (cached per image)
     with st.spinner("Running OCR..."):
-        if ocr_lang == "auto":
-            detected_lang, raw_results = run_ocr_auto(img_np)
-            st.info(f"🔍 **Auto-detected language:** {detected_lang}")
-        else:
-            raw_results = run_ocr(img_np, ocr_lang)
-            detected_lang = ocr_lang
-    
-    # Process results
-    items = []
-    for box, text, conf in raw_results:
-        t = (text or "").strip()
-        if not t or conf < min_conf:
-            continue
-        
-        items.append({
-            "text": t,
-            "box": [(float(p[0]), float(p[1])) for p in box],
-            "conf": float(conf)
-        })
+        detected_lang, raw_results, inv_scale = run_ocr_cached(img_bytes, ocr_lang, ocr_max_side)
+    
+    if ocr_lang == "auto":
+        st.info(f"🔍 **Auto-detected language:** {detected_lang}")
+    
+    # Process results (filtering stays outside the cache so sliders don't bust it)
+    page = OCRPage.from_raw(raw_results, min_conf, inv_scale)
     
-    st.success(f"Found {len(items)} text regions")
+    st.success(f"Found {len(page)} text regions")
     
-    if not items:
+    if not len(page):
         st.warning("No text detected. Try adjusting the confidence threshold.")
         return
     
     # Merge nearby boxes if requested
     if merge_lines:
-        items = merge_nearby_boxes(items)
-        st.info(f"After merging: {len(items)} text regions")
+        page = page.merged()
+        st.info(f"After merging: {len(page)} text regions")
     
-    # Sort reading order
-    items = sort_reading_order(items)
-    
-    # Index them
-    for idx, item in enumerate(items, start=1):
-        item["index"] = idx
+    # Sort reading order and index them
+    page = page.sorted()
+    items = page.to_items()
     
     # Translate (uses batching for OpenAI to avoid 429)
     with st.spinner(f"Translating to {target_lang}..."):
-        items = translate_batch(
+        items = translate_with_preview(
             items,
             detected_lang,
             target_lang,
@@ -224,7 +464,7 @@ def process_local(
     st.success("Translation complete!")
     
     # Draw annotated image
-    annotated = draw_numbered_boxes(img, items)
+    annotated = draw_numbered_boxes(img, page)
     
     # Display results
     col1, col2 = st.columns(2)
@@ -247,7 +487,8 @@ def process_local(
     
     with col1:
         buf = io.BytesIO()
-        annotated.save(buf, format="PNG")
+        # Fast zlib level: the PNG is a transient download, encode time matters more than size
+        annotated.save(buf, format="PNG", compress_level=1)
         st.download_button(
             "📥 Download Annotated PNG",
             buf.getvalue(),
@@ -331,6 +572,8 @@ def main():
             help="Auto-detect recommended for manga. Manual selection for specific languages."
         )
         
+        st.caption(f"OCR device: {detect_device()}")
+        
         if ocr_lang == "auto":
             st.info("💡 Two-pass detection: Safe multi-lang first, then Chinese if needed")
         
@@ -346,6 +589,12 @@ def main():
             help="Combine text boxes that are close together"
         )
         
+        ocr_max_side = st.number_input(
+            "OCR Max Image Side (px)",
+            min_value=0, max_value=8000, value=1600, step=100,
+            help="Downscale larger images before OCR for speed. 0 = no downscaling"
+        )
+        
         st.markdown("---")
         
         # Translation settings
@@ -383,7 +632,7 @@ def main():
                 help="Model to use for translation"
             )
             
-            st.info("💡 Batched translation (18 texts/request) reduces API calls and avoids 429 rate limits")
+            st.info("💡 Batched translation (texts packed into ~3000-token requests) reduces API calls and avoids 429 rate limits")
         
         st.markdown("---")
         st.markdown("""
@@ -434,7 +683,8 @@ def main():
                             openai_model=openai_model,
                             daytona_api_key=daytona_key,
                             min_conf=min_conf,
-                            merge_lines=merge_lines
+                            merge_lines=merge_lines,
+                            ocr_max_side=int(ocr_max_side)
                         )
                     
                     st.success("Processing complete!")
@@ -478,13 +728,15 @@ def main():
                 st.info("💻 Running locally on your machine")
                 process_local(
                     img,
+                    uploaded_file.getvalue(),
                     ocr_lang,
                     target_lang,
                     backend,
                     min_conf,
                     merge_lines,
                     openai_key,
-                    openai_model
+                    openai_model,
+                    int(ocr_max_side)
                 )
     
     else:
@@ -1,6 +1,7 @@
 """
 Daytona sandbox runner - manages sandbox lifecycle and execution
 """
+import json
 import time
 from typing import Optional, Dict
 
@@ -12,6 +13,10 @@ _daytona_client: Optional[Daytona] = None
 _sandbox = None
 _sandbox_ready = False
 
+# The worker runs as a persistent server inside the sandbox so EasyOCR models
+# are loaded once, not on every page
+WORKER_PORT = 8000
+
 
 def get_daytona_client(api_key: Optional[str] = None) -> Daytona:
     """Get or create Daytona client"""
@@ -69,13 +74,53 @@ def ensure_sandbox_deps(api_key: Optional[str] = None) -> None:
     # Keep it minimal but sufficient
     sb.process.exec(
         "pip install easyocr==1.7.1 opencv-python-headless==4.9.0.80 "
-        "pillow==10.2.0 numpy==1.26.4 pandas==2.2.0 requests==2.31.0"
+        "pillow==10.2.0 numpy==1.26.4 requests==2.31.0 orjson==3.9.15"
     )
 
+    # Fetch all OCR models now so the first run doesn't download them
+    with open("prefetch_models.py", "rb") as f:
+        sb.fs.upload_file(f.read(), "prefetch_models.py")
+    sb.process.exec("python prefetch_models.py")
+
+    start_worker_server(sb)
+
     _sandbox_ready = True
     print("Sandbox dependencies installed!")
 
 
+def start_worker_server(sb, timeout_s: int = 120) -> None:
+    """
+    Uploads sandbox_worker.py and starts it in server mode, then waits until
+    its /health endpoint answers.
+    """
+    # Upload worker code (this file must exist locally in your repo)
+    with open("sandbox_worker.py", "rb") as f:
+        sb.fs.upload_file(f.read(), "sandbox_worker.py")
+
+    sb.process.exec(
+        f"nohup python sandbox_worker.py --serve --port {WORKER_PORT} > worker.log 2>&1 &"
+    )
+
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if worker_alive(sb):
+            print("Sandbox worker server is up")
+            return
+        time.sleep(2)
+
+    raise RuntimeError("Sandbox worker server did not start (see worker.log in the sandbox)")
+
+
+def worker_alive(sb) -> bool:
+    """True if the worker server in the sandbox answers its /health endpoint"""
+    health_cmd = (
+        "python -c \"import urllib.request; "
+        f"urllib.request.urlopen('http://127.0.0.1:{WORKER_PORT}/health', timeout=5)\""
+    )
+    resp = sb.process.exec(health_cmd)
+    return getattr(resp, "exit_code", 1) == 0
+
+
 def run_in_daytona(
     image_bytes: bytes,
     ocr_lang: str,
@@ -85,10 +130,11 @@ def run_in_daytona(
     openai_model: str = "gpt-4o-mini",
     daytona_api_key: Optional[str] = None,
     min_conf: float = 0.35,
-    merge_lines: bool = True
+    merge_lines: bool = True,
+    ocr_max_side: int = 1600
 ) -> Dict[str, bytes]:
     """
-    Uploads image + worker script to sandbox, runs processing, downloads results.
+    Uploads image + options to the sandbox, runs processing on the worker server, downloads results.
     Returns dict: {"annotated_png": bytes, "results_json": bytes, "results_csv": bytes}
     """
     sb = get_or_create_sandbox(daytona_api_key)
@@ -97,31 +143,56 @@ def run_in_daytona(
     # Upload inputs
     sb.fs.upload_file(image_bytes, "input.png")
 
-    # Upload worker code (this file must exist locally in your repo)
-    with open("sandbox_worker.py", "rb") as f:
-        sb.fs.upload_file(f.read(), "sandbox_worker.py")
+    # Options go in a JSON file (keeps the API key off the command line)
+    options = {
+        "image": "input.png",
+        "ocr_lang": ocr_lang,
+        "target_lang": target_lang,
+        "backend": translator_backend,
+        "min_conf": min_conf,
+        "merge_lines": merge_lines,
+        "ocr_max_side": int(ocr_max_side),
+        "openai_key": openai_key,
+        "openai_model": openai_model,
+    }
+    request_body = json.dumps(options).encode("utf-8")
 
-    # Build command
+    # Run on the already-loaded worker server. The client deletes request.json
+    # as soon as it has read it (the sandbox outlives this run), and prints the
+    # server's reply so a 500's {"error": ...} reaches the caller.
     cmd = (
-        "python sandbox_worker.py "
-        f"--image input.png "
-        f"--ocr_lang {ocr_lang} "
-        f"--target_lang {target_lang} "
-        f"--backend '{translator_backend}' "
-        f"--min_conf {min_conf} "
+        "python -c \"import http.client, os, sys; "
+        "body = open('request.json', 'rb').read(); os.remove('request.json'); "
+        f"c = http.client.HTTPConnection('127.0.0.1', {WORKER_PORT}, timeout=900); "
+        "c.request('POST', '/process', body, {'Content-Type': 'application/json'}); "
+        "r = c.getresponse(); print(r.read().decode('utf-8', 'replace')); "
+        "sys.exit(r.status != 200)\""
     )
-    
-    if merge_lines:
-        cmd += "--merge_lines "
-    
-    if openai_key:
-        cmd += f"--openai_key '{openai_key}' "
-    
-    cmd += f"--openai_model '{openai_model}'"
-
-    # Run
-    print(f"Running in sandbox: {cmd}")
-    sb.process.exec(cmd)
+
+    def _post():
+        sb.fs.upload_file(request_body, "request.json")
+        return sb.process.exec(cmd, timeout=900)
+
+    print(f"Running in sandbox worker: ocr_lang={ocr_lang} target_lang={target_lang} backend={translator_backend}")
+
+    # The server may have died since it was started (e.g. OOM on a large page)
+    if not worker_alive(sb):
+        print("Sandbox worker server is down, restarting it")
+        start_worker_server(sb)
+
+    resp = _post()
+    if getattr(resp, "exit_code", 0) != 0 and not worker_alive(sb):
+        # Crashed while processing this page: restart and retry once
+        print("Sandbox worker server crashed, restarting it and retrying")
+        start_worker_server(sb)
+        resp = _post()
+    if getattr(resp, "exit_code", 0) != 0:
+        output = getattr(resp, "result", "") or ""
+        try:
+            error = json.loads(output).get("error") or output
+        except (ValueError, AttributeError):
+            error = output
+        raise RuntimeError(f"Sandbox worker failed: {error}")
 
     # Download outputs
     annotated_png = sb.fs.download_file("annotated.png")
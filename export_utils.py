@@ -1,23 +1,41 @@
 """
 Export utilities: JSON and CSV generation
 """
+import csv
+import io
 import json
-import pandas as pd
 from typing import List, Dict
 
+try:
+    import orjson  # optional: much faster JSON encoding
+except ImportError:
+    orjson = None
+
+
+CSV_FIELDS = ["index", "text", "translation", "conf", "box"]
+
+
+def _dump_json_bytes(data) -> bytes:
+    """Serialize to indented UTF-8 JSON (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
 
 def export_json(items: List[Dict]) -> str:
     """Export results to JSON string"""
-    data = {"items": items}
-    return json.dumps(data, ensure_ascii=False, indent=2)
+    return _dump_json_bytes({"items": items}).decode("utf-8")
 
 
 def export_csv(items: List[Dict]) -> str:
     """Export results to CSV string"""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    
     # Flatten the data for CSV
-    rows = []
     for item in items:
-        rows.append({
+        writer.writerow({
             "index": item.get("index", 0),
             "text": item.get("text", ""),
             "translation": item.get("translation", ""),
@@ -25,17 +43,16 @@ def export_csv(items: List[Dict]) -> str:
             "box": str(item.get("box", []))
         })
     
-    df = pd.DataFrame(rows)
-    return df.to_csv(index=False)
+    return buf.getvalue()
 
 
 def save_json(items: List[Dict], filepath: str) -> None:
     """Save results to JSON file"""
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(export_json(items))
+    with open(filepath, "wb") as f:
+        f.write(_dump_json_bytes({"items": items}))
 
 
 def save_csv(items: List[Dict], filepath: str) -> None:
     """Save results to CSV file"""
-    with open(filepath, "w", encoding="utf-8") as f:
+    with open(filepath, "w", encoding="utf-8", newline="") as f:
         f.write(export_csv(items))
@@ -55,6 +55,10 @@ echo.
 echo Step 7: Installing Daytona...
 pip install daytona
 
+echo.
+echo Step 8: Pre-downloading EasyOCR models (avoids downloads on first run)...
+python prefetch_models.py
+
 echo.
 echo ========================================
 echo Installation Complete!
@@ -0,0 +1,57 @@
+"""
+Numba kernels for the box-merge grouping.
+Optional: ocr_utils imports this module only when numba is installed
+and falls back to the pure-Python version otherwise.
+"""
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def _find(parent, i):
+    """Union-find root with path halving"""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+@njit(cache=True)
+def merge_group_ids(expanded):
+    """
+    Group id per box for expanded rects (N, 4) as x1, y1, x2, y2 (see
+    ocr_utils.expand_rects): boxes whose expanded rects overlap share an id,
+    transitively. Ids are numbered in order of each group's first box
+    (same grouping as ocr_utils.merge_groups).
+    """
+    n = expanded.shape[0]
+
+    # Sweep in x1 order: the candidates for a box are the following boxes
+    # that start before it ends
+    by_x = np.argsort(expanded[:, 0], kind="mergesort")
+    parent = np.arange(n)
+    for a in range(n):
+        i = by_x[a]
+        for b in range(a + 1, n):
+            j = by_x[b]
+            if expanded[j, 0] >= expanded[i, 2]:
+                break
+            if max(expanded[i, 1], expanded[j, 1]) < min(expanded[i, 3], expanded[j, 3]):
+                ri = _find(parent, i)
+                rj = _find(parent, j)
+                # Attach to the smaller root, so every root is its group's first box
+                if ri < rj:
+                    parent[rj] = ri
+                elif rj < ri:
+                    parent[ri] = rj
+
+    ids = np.empty(n, dtype=np.int64)
+    next_id = 0
+    for i in range(n):
+        r = _find(parent, i)
+        if r == i:
+            ids[i] = next_id
+            next_id += 1
+        else:
+            ids[i] = ids[r]
+    return ids
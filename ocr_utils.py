@@ -1,8 +1,54 @@
 """
-OCR utilities: reading order sorting and text box merging
+OCR utilities: device selection, reading order sorting and text box merging
 """
+import platform
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
 from typing import List, Dict, Tuple
 
+import numpy as np
+
+try:
+    from ocr_geom_numba import merge_group_ids as _merge_group_ids  # optional: JIT merge kernel
+except ImportError:
+    _merge_group_ids = None
+
+
+@lru_cache(maxsize=1)
+def detect_device() -> str:
+    """
+    Pick the best available Torch device for EasyOCR.
+    Returns: "cuda", "mps" or "cpu"
+    """
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+
+    if torch.cuda.is_available():
+        return "cuda"
+
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+
+    return "cpu"
+
+
+@lru_cache(maxsize=1)
+def prefer_openvino() -> bool:
+    """
+    True when the OpenVINO runtime is installed on an x86 CPU host.
+    EasyOCR's OpenVINO backend is several times faster than PyTorch on Intel CPUs.
+    """
+    if platform.machine().lower() not in ("x86_64", "amd64", "i386", "i686"):
+        return False
+    try:
+        import openvino  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
 def box_to_rect(box: List[List[float]]) -> Tuple[float, float, float, float]:
     """Convert 4-point box to rectangle (x1, y1, x2, y2)"""
@@ -11,104 +57,229 @@ def box_to_rect(box: List[List[float]]) -> Tuple[float, float, float, float]:
     return min(xs), min(ys), max(xs), max(ys)
 
 
-def rect_center(rect: Tuple[float, float, float, float]) -> Tuple[float, float]:
-    """Get center point of rectangle"""
-    x1, y1, x2, y2 = rect
-    return (x1 + x2) / 2.0, (y1 + y2) / 2.0
+# Below this many boxes a plain Python sort beats NumPy's per-call overhead
+READING_ORDER_NUMPY_MIN = 32
 
 
-def sort_reading_order(items: List[Dict]) -> List[Dict]:
+def reading_order(centers: np.ndarray) -> np.ndarray:
     """
-    Sort OCR results in reading order (top-to-bottom, left-to-right within rows).
-    Uses a simple bucket-based approach.
+    Reading order permutation for (N, 2) box centers
+    (top-to-bottom by row bucket, left-to-right within rows).
     """
-    if not items:
-        return items
-    
-    # Get centers
-    centers = [((rect_center(box_to_rect(it["box"]))), it) for it in items]
+    cx = centers[:, 0]
+    cy = centers[:, 1]
     
     # Calculate row bucket size
-    ys = [c[0][1] for c in centers]
-    y_span = max(ys) - min(ys) if ys else 1.0
+    y_span = cy.max() - cy.min()
     row_bucket = max(12.0, y_span / 20.0)
     
-    def row_key(y):
-        return int(y // row_bucket)
+    if len(centers) < READING_ORDER_NUMPY_MIN:
+        # Same keys and stable tie-break as the lexsort below
+        xs = cx.tolist()
+        ys = cy.tolist()
+        order = sorted(range(len(xs)), key=lambda i: (ys[i] // row_bucket, xs[i]))
+        return np.asarray(order, dtype=np.intp)
     
-    # Group into rows
-    buckets = {}
-    for (cx, cy), it in centers:
-        buckets.setdefault(row_key(cy), []).append(((cx, cy), it))
+    rows = (cy // row_bucket).astype(np.int64)
     
-    # Sort each row by x-coordinate
-    ordered = []
-    for rk in sorted(buckets.keys()):
-        row_sorted = sorted(buckets[rk], key=lambda t: t[0][0])
-        ordered.extend([it for _, it in row_sorted])
+    # Sort by row, then by x-coordinate within each row
+    return np.lexsort((cx, rows))
+
+
+# Two boxes are neighbours when their rects, grown on every side by
+# threshold * MERGE_MARGIN (x, y), overlap
+MERGE_MARGIN = (2.0, 0.5)
+
+# Up to this many boxes the full N x N overlap matrix is built in one broadcast;
+# bigger pages use a sort-and-sweep over x instead (same pairs, no N^2 memory)
+MERGE_DENSE_MAX = 1024
+
+
+def expand_rects(rects: np.ndarray, threshold: float = 50.0) -> np.ndarray:
+    """Grow (N, 4) rects by the merge margin: (x1 - mx, y1 - my, x2 + mx, y2 + my)"""
+    mx = threshold * MERGE_MARGIN[0]
+    my = threshold * MERGE_MARGIN[1]
+    return np.asarray(rects, dtype=np.float64) + np.array([-mx, -my, mx, my])
+
+
+def _overlap_pairs(expanded: np.ndarray) -> List[Tuple[int, int]]:
+    """All index pairs (i < j) whose expanded rects overlap"""
+    n = len(expanded)
+    if n <= MERGE_DENSE_MAX:
+        # Broadcast (N, 1) against (1, N): intersection of every pair at once
+        ix1 = np.maximum(expanded[:, None, 0], expanded[None, :, 0])
+        iy1 = np.maximum(expanded[:, None, 1], expanded[None, :, 1])
+        ix2 = np.minimum(expanded[:, None, 2], expanded[None, :, 2])
+        iy2 = np.minimum(expanded[:, None, 3], expanded[None, :, 3])
+        overlap = (ix2 > ix1) & (iy2 > iy1)
+        ii, jj = np.nonzero(np.triu(overlap, k=1))
+        return list(zip(ii.tolist(), jj.tolist()))
     
-    return ordered
+    # Sweep in x1 order: the candidates for a box are the following boxes
+    # that start before it ends
+    order = np.argsort(expanded[:, 0], kind="stable")
+    x1, y1, x2, y2 = (expanded[order, k].tolist() for k in range(4))
+    order = order.tolist()
+    pairs = []
+    for a in range(n):
+        for b in range(a + 1, n):
+            if x1[b] >= x2[a]:
+                break
+            if max(y1[a], y1[b]) < min(y2[a], y2[b]):
+                i, j = order[a], order[b]
+                pairs.append((i, j) if i < j else (j, i))
+    return pairs
 
 
-def merge_nearby_boxes(items: List[Dict], threshold: float = 50.0) -> List[Dict]:
+def merge_groups(rects: np.ndarray, threshold: float = 50.0) -> List[List[int]]:
     """
-    Optionally merge OCR boxes that are very close together.
-    Simple heuristic: if two boxes are within threshold pixels horizontally and
-    on the same row, merge them.
+    Group indices of boxes that should be merged.
+    Simple heuristic: two boxes belong together when their rects overlap after
+    growing them by 2 * threshold pixels horizontally and threshold / 2 vertically
+    (see MERGE_MARGIN). Grouping is transitive (A~B and B~C puts all three in
+    one group) and does not depend on input order.
+    Returns groups in order of their first index, members in ascending order.
+    Uses the numba kernel (ocr_geom_numba) when numba is installed.
     """
-    if not items or len(items) <= 1:
-        return items
+    expanded = expand_rects(rects, threshold)
+    
+    if _merge_group_ids is not None:
+        ids = _merge_group_ids(np.ascontiguousarray(expanded))
+        groups = [[] for _ in range(int(ids.max()) + 1 if len(ids) else 0)]
+        for i, g in enumerate(ids.tolist()):
+            groups[g].append(i)
+        return groups
+    
+    # Union-find over indices: merges are transitive and order-independent
+    parent = list(range(len(expanded)))
     
-    merged = []
-    skip = set()
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
     
-    for i, item in enumerate(items):
-        if i in skip:
-            continue
+    for i, j in _overlap_pairs(expanded):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    
+    groups = {}
+    for i in range(len(parent)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def _group_rect(rects: np.ndarray, group: List[int]) -> Tuple[float, float, float, float]:
+    """Bounding rectangle (x1, y1, x2, y2) of a group of rects"""
+    return (
+        float(rects[group, 0].min()),
+        float(rects[group, 1].min()),
+        float(rects[group, 2].max()),
+        float(rects[group, 3].max()),
+    )
+
+
+# Box coordinates are whole pixels. int32 rather than int16: long webtoon
+# strips can be taller than 32767 px
+BOX_DTYPE = np.int32
+
+
+@dataclass
+class OCRPage:
+    """
+    OCR results for one page as parallel arrays (struct-of-arrays) instead of
+    a list of per-item dicts: merge, sort and drawing work on whole arrays,
+    and to_items() builds the dicts only where an API needs them (translate/export).
+    """
+    texts: List[str]
+    boxes: np.ndarray  # (N, 4, 2) corner points, whole pixels (BOX_DTYPE)
+    confs: np.ndarray  # (N,)
+    translations: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_raw(cls, raw: list, min_conf: float = 0.0, scale: float = 1.0) -> "OCRPage":
+        """
+        Build a page from EasyOCR (box, text, conf) results, dropping empty
+        and low-confidence entries and scaling boxes by scale.
+        """
+        if not raw:
+            return cls([], np.empty((0, 4, 2), dtype=BOX_DTYPE), np.empty(0, dtype=np.float64))
         
-        rect_i = box_to_rect(item["box"])
-        cx_i, cy_i = rect_center(rect_i)
+        # Whole-array conversion and one boolean mask instead of per-point floats
+        texts = [(r[1] or "").strip() for r in raw]
+        confs = np.asarray([r[2] for r in raw], dtype=np.float64)
+        keep = (confs >= min_conf) & np.fromiter(map(bool, texts), dtype=bool, count=len(texts))
+        boxes = np.asarray([r[0] for r in raw], dtype=np.float64)[keep]
+        if scale != 1.0:
+            boxes *= scale
+        boxes = np.rint(boxes).astype(BOX_DTYPE)
+        return cls([texts[i] for i in np.flatnonzero(keep)], boxes, confs[keep])
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @cached_property
+    def rects(self) -> np.ndarray:
+        """(N, 4) rectangles as x1, y1, x2, y2"""
+        return np.concatenate([self.boxes.min(axis=1), self.boxes.max(axis=1)], axis=1)
+
+    @cached_property
+    def centers(self) -> np.ndarray:
+        """(N, 2) rectangle centers as cx, cy"""
+        return (self.rects[:, :2] + self.rects[:, 2:]) * 0.5
+
+    def take(self, order) -> "OCRPage":
+        """New page with entries reordered/selected by an index array"""
+        order = np.asarray(order, dtype=np.intp)
+        return OCRPage(
+            [self.texts[i] for i in order],
+            self.boxes[order],
+            self.confs[order],
+            [self.translations[i] for i in order] if self.translations else [],
+        )
+
+    def sorted(self) -> "OCRPage":
+        """New page in reading order"""
+        if len(self) == 0:
+            return self
+        return self.take(reading_order(self.centers))
+
+    def merged(self, threshold: float = 50.0) -> "OCRPage":
+        """New page with nearby boxes merged (see merge_groups)"""
+        if len(self) <= 1:
+            return self
         
-        # Look for mergeable boxes
-        to_merge = [item]
+        groups = merge_groups(self.rects, threshold)
+        if len(groups) == len(self):
+            return self
         
-        for j in range(i + 1, len(items)):
-            if j in skip:
+        boxes = np.empty((len(groups), 4, 2), dtype=self.boxes.dtype)
+        confs = np.empty(len(groups), dtype=self.confs.dtype)
+        texts = []
+        for k, group in enumerate(groups):
+            if len(group) == 1:
+                i = group[0]
+                texts.append(self.texts[i])
+                boxes[k] = self.boxes[i]
+                confs[k] = self.confs[i]
                 continue
             
-            rect_j = box_to_rect(items[j]["box"])
-            cx_j, cy_j = rect_center(rect_j)
-            
-            # Same row and close horizontally?
-            if abs(cy_i - cy_j) < threshold / 2 and abs(cx_i - cx_j) < threshold * 2:
-                to_merge.append(items[j])
-                skip.add(j)
+            x1, y1, x2, y2 = _group_rect(self.rects, group)
+            texts.append(" ".join([self.texts[j] for j in group]))
+            boxes[k] = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            confs[k] = self.confs[group].mean()
         
-        if len(to_merge) == 1:
-            merged.append(item)
-        else:
-            # Merge text and boxes
-            merged_text = " ".join([it["text"] for it in to_merge])
-            all_boxes = [box_to_rect(it["box"]) for it in to_merge]
-            
-            x1 = min([b[0] for b in all_boxes])
-            y1 = min([b[1] for b in all_boxes])
-            x2 = max([b[2] for b in all_boxes])
-            y2 = max([b[3] for b in all_boxes])
-            
-            merged_box = [
-                [x1, y1],
-                [x2, y1],
-                [x2, y2],
-                [x1, y2]
-            ]
-            
-            avg_conf = sum([it["conf"] for it in to_merge]) / len(to_merge)
-            
-            merged.append({
-                "text": merged_text,
-                "box": merged_box,
-                "conf": avg_conf
-            })
-    
-    return merged
+        return OCRPage(texts, boxes, confs)
+
+    def to_items(self) -> List[Dict]:
+        """Per-item dicts (text, box, conf, index[, translation]) for translation and export"""
+        boxes = self.boxes.tolist()
+        confs = self.confs.tolist()
+        items = []
+        for idx, (text, box, conf) in enumerate(zip(self.texts, boxes, confs), start=1):
+            item = {"text": text, "box": [tuple(p) for p in box], "conf": conf, "index": idx}
+            if self.translations:
+                item["translation"] = self.translations[idx - 1]
+            items.append(item)
+        return items
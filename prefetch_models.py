@@ -0,0 +1,46 @@
+"""
+Pre-download EasyOCR model weights so the first OCR run doesn't pay for them.
+
+Run once at install / image build time:
+    python prefetch_models.py
+
+Set EASYOCR_MODEL_DIR to store models in a fixed directory (the app reads the
+same variable); otherwise EasyOCR's default (~/.EasyOCR) is used.
+"""
+import os
+
+import easyocr
+
+
+# Same language combinations the auto-detect sweep tries (see safe_easyocr_lang_list)
+LANG_SETS = [
+    ["ja", "en"],
+    ["ch_sim", "en"],
+    ["ko", "en"],
+    ["en"],
+    ["ar", "en"],
+    ["fr", "en"],
+    ["ch_tra", "en"],
+]
+
+
+def main():
+    model_dir = os.environ.get("EASYOCR_MODEL_DIR") or None
+    if model_dir:
+        os.makedirs(model_dir, exist_ok=True)
+
+    for langs in LANG_SETS:
+        print(f"Fetching EasyOCR models for {langs}...")
+        easyocr.Reader(
+            langs,
+            gpu=False,
+            download_enabled=True,
+            model_storage_directory=model_dir,
+            user_network_directory=model_dir,
+        )
+
+    print(f"Done. Models stored in: {model_dir or '~/.EasyOCR'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@
 Sandbox worker - runs inside Daytona sandbox
 Performs OCR, translation, and exports
 
+Usage:
+    python sandbox_worker.py --image input.png --ocr_lang auto ...   (one-shot)
+    python sandbox_worker.py --serve --port 8000                     (persistent server)
+
 Fixed issues:
 1. Safe EasyOCR language handling (ch_sim only with en)
 2. Batched OpenAI translation to avoid 429 errors
@@ -9,16 +13,26 @@ Fixed issues:
 4. Proper error handling and retries
 """
 import argparse
+import csv
 import json
 import random
 import time
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import List, Dict, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-import pandas as pd
 import easyocr
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson  # optional: faster JSON encode/decode
+except ImportError:
+    orjson = None
 
 
 # ============================================================================
@@ -51,144 +65,291 @@ def safe_easyocr_lang_list(primary: str) -> List[str]:
     return [primary if primary else "en"]
 
 
+def detect_device() -> str:
+    """Pick the best available Torch device (cuda, mps or cpu)"""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+
+    if torch.cuda.is_available():
+        return "cuda"
+
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+
+    return "cpu"
+
+
+@lru_cache(maxsize=8)
+def make_reader(langs: Tuple[str, ...]):
+    """
+    Create (once per language tuple) an EasyOCR reader on GPU when available, CPU otherwise.
+    Cached so auto-detect never builds the same reader twice.
+    """
+    use_gpu = detect_device() != "cpu"
+    try:
+        return easyocr.Reader(list(langs), gpu=use_gpu, cudnn_benchmark=use_gpu)
+    except RuntimeError:
+        if not use_gpu:
+            raise
+        print(f"GPU reader init failed for {langs}, falling back to CPU")
+        return easyocr.Reader(list(langs), gpu=False)
+
+
 def run_ocr(img_np: np.ndarray, primary_lang: str):
     """Run OCR with safe language list"""
-    langs = safe_easyocr_lang_list(primary_lang)
-    reader = easyocr.Reader(langs, gpu=False)
+    reader = make_reader(tuple(safe_easyocr_lang_list(primary_lang)))
     return reader.readtext(img_np)
 
 
 def run_ocr_auto(img_np: np.ndarray):
     """
-    Auto language detection:
-    Pass 1: Safe multi-lang (no Chinese)
-    Pass 2: Chinese if needed
+    Auto language detection (same strategy as app.py):
+    try SAFE language configurations one-by-one, score the results, pick the best.
+    Japanese/Chinese/etc. readers can only be combined with English.
     """
-    # Pass 1
-    reader1 = easyocr.Reader(["ja", "ko", "en", "ar", "fr"], gpu=False)
-    raw1 = reader1.readtext(img_np)
-    
-    if len(raw1) >= 4:
-        return "auto", raw1
-    
-    # Pass 2: Chinese
-    raw2 = run_ocr(img_np, "ch_sim")
-    
-    if len(raw2) > len(raw1):
-        return "ch_sim", raw2
-    
-    return "auto", raw1
+    def _clean(raw):
+        return [r for r in raw if (r[1] or "").strip()]
+
+    def _score(raw):
+        raw = _clean(raw)
+        if not raw:
+            return 0.0
+        avg_conf = sum(float(r[2]) for r in raw) / len(raw)
+        return len(raw) * avg_conf
+
+    candidates = ["ja", "ch_sim", "ko", "en", "ar", "fr", "ch_tra"]
+    best = {"lang": "en", "raw": [], "score": 0.0}
+
+    for primary in candidates:
+        try:
+            raw = run_ocr(img_np, primary)
+        except Exception as e:
+            print(f"OCR pass {primary} failed: {e}")
+            continue
+
+        s = _score(raw)
+        if s > best["score"]:
+            best = {"lang": primary, "raw": raw, "score": s}
+
+        # Early exit if we already got a strong result
+        if best["score"] >= 6.0 and len(_clean(best["raw"])) >= 8:
+            break
+
+    return best["lang"], best["raw"]
 
 
 # ============================================================================
 # OCR Utilities
 # ============================================================================
 
-def box_to_rect(box):
-    """Convert 4-point box to rectangle"""
-    xs = [p[0] for p in box]
-    ys = [p[1] for p in box]
-    return min(xs), min(ys), max(xs), max(ys)
+def reading_order(centers):
+    """Reading order permutation for (N, 2) box centers"""
+    cx = centers[:, 0]
+    cy = centers[:, 1]
 
+    row_bucket = max(12.0, (cy.max() - cy.min()) / 20.0)
 
-def rect_center(rect):
-    """Get center of rectangle"""
-    x1, y1, x2, y2 = rect
-    return (x1 + x2) / 2.0, (y1 + y2) / 2.0
+    if len(centers) < 32:
+        # Tiny pages: a plain Python sort beats NumPy's per-call overhead
+        xs = cx.tolist()
+        ys = cy.tolist()
+        return np.asarray(sorted(range(len(xs)), key=lambda i: (ys[i] // row_bucket, xs[i])), dtype=np.intp)
 
+    rows = (cy // row_bucket).astype(np.int64)
 
-def sort_reading_order(items):
-    """Sort items in reading order"""
-    if not items:
-        return items
-    
-    centers = [((rect_center(box_to_rect(it["box"]))), it) for it in items]
-    ys = [c[0][1] for c in centers]
-    y_span = max(ys) - min(ys) if ys else 1.0
-    row_bucket = max(12.0, y_span / 20.0)
-
-    def row_key(y):
-        return int(y // row_bucket)
-
-    buckets = {}
-    for (cx, cy), it in centers:
-        buckets.setdefault(row_key(cy), []).append(((cx, cy), it))
-
-    ordered = []
-    for rk in sorted(buckets.keys()):
-        row_sorted = sorted(buckets[rk], key=lambda t: t[0][0])
-        ordered.extend([it for _, it in row_sorted])
+    return np.lexsort((cx, rows))
+
+
+# Two boxes are neighbours when their rects, grown on every side by
+# threshold * MERGE_MARGIN (x, y), overlap
+MERGE_MARGIN = (2.0, 0.5)
+
+# Up to this many boxes the N x N overlap matrix is built in one broadcast,
+# bigger pages use a sort-and-sweep over x
+MERGE_DENSE_MAX = 1024
+
+
+def _overlap_pairs(expanded):
+    """All index pairs (i < j) whose expanded rects overlap"""
+    n = len(expanded)
+    if n <= MERGE_DENSE_MAX:
+        ix1 = np.maximum(expanded[:, None, 0], expanded[None, :, 0])
+        iy1 = np.maximum(expanded[:, None, 1], expanded[None, :, 1])
+        ix2 = np.minimum(expanded[:, None, 2], expanded[None, :, 2])
+        iy2 = np.minimum(expanded[:, None, 3], expanded[None, :, 3])
+        overlap = (ix2 > ix1) & (iy2 > iy1)
+        ii, jj = np.nonzero(np.triu(overlap, k=1))
+        return list(zip(ii.tolist(), jj.tolist()))
     
-    return ordered
+    order = np.argsort(expanded[:, 0], kind="stable")
+    x1, y1, x2, y2 = (expanded[order, k].tolist() for k in range(4))
+    order = order.tolist()
+    pairs = []
+    for a in range(n):
+        for b in range(a + 1, n):
+            if x1[b] >= x2[a]:
+                break
+            if max(y1[a], y1[b]) < min(y2[a], y2[b]):
+                i, j = order[a], order[b]
+                pairs.append((i, j) if i < j else (j, i))
+    return pairs
 
 
-def merge_nearby_boxes(items, threshold=50.0):
-    """Merge nearby text boxes"""
-    if not items or len(items) <= 1:
-        return items
+def merge_groups(rects, threshold=50.0):
+    """Group indices of nearby text boxes (rects overlap once grown by the merge margin)"""
+    mx = threshold * MERGE_MARGIN[0]
+    my = threshold * MERGE_MARGIN[1]
+    expanded = np.asarray(rects, dtype=np.float64) + np.array([-mx, -my, mx, my])
     
-    merged = []
-    skip = set()
+    # Union-find over indices: merges are transitive and order-independent
+    parent = list(range(len(expanded)))
     
-    for i, item in enumerate(items):
-        if i in skip:
-            continue
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j in _overlap_pairs(expanded):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    
+    # Groups in order of their first item, members in original order
+    groups = {}
+    for i in range(len(parent)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+# Box coordinates are whole pixels. int32 rather than int16: long webtoon
+# strips can be taller than 32767 px
+BOX_DTYPE = np.int32
+
+
+@dataclass
+class OCRPage:
+    """OCR results for one page as parallel arrays (texts / boxes / confs / translations)"""
+    texts: List[str]
+    boxes: np.ndarray  # (N, 4, 2) corner points, whole pixels (BOX_DTYPE)
+    confs: np.ndarray  # (N,)
+    translations: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_raw(cls, raw, min_conf=0.0, scale=1.0):
+        """Build a page from EasyOCR results, dropping empty/low-confidence entries"""
+        if not raw:
+            return cls([], np.empty((0, 4, 2), dtype=BOX_DTYPE), np.empty(0, dtype=np.float64))
+        
+        # Whole-array conversion and one boolean mask instead of per-point floats
+        texts = [(r[1] or "").strip() for r in raw]
+        confs = np.asarray([r[2] for r in raw], dtype=np.float64)
+        keep = (confs >= min_conf) & np.fromiter(map(bool, texts), dtype=bool, count=len(texts))
+        boxes = np.asarray([r[0] for r in raw], dtype=np.float64)[keep]
+        if scale != 1.0:
+            boxes *= scale
+        boxes = np.rint(boxes).astype(BOX_DTYPE)
+        return cls([texts[i] for i in np.flatnonzero(keep)], boxes, confs[keep])
+
+    def __len__(self):
+        return len(self.texts)
+
+    @cached_property
+    def rects(self):
+        """(N, 4) rectangles as x1, y1, x2, y2"""
+        return np.concatenate([self.boxes.min(axis=1), self.boxes.max(axis=1)], axis=1)
+
+    @cached_property
+    def centers(self):
+        """(N, 2) rectangle centers"""
+        return (self.rects[:, :2] + self.rects[:, 2:]) * 0.5
+
+    def take(self, order):
+        """New page with entries reordered by an index array"""
+        order = np.asarray(order, dtype=np.intp)
+        return OCRPage(
+            [self.texts[i] for i in order],
+            self.boxes[order],
+            self.confs[order],
+            [self.translations[i] for i in order] if self.translations else [],
+        )
+
+    def sorted(self):
+        """New page in reading order"""
+        if len(self) == 0:
+            return self
+        return self.take(reading_order(self.centers))
+
+    def merged(self, threshold=50.0):
+        """New page with nearby boxes merged"""
+        if len(self) <= 1:
+            return self
         
-        rect_i = box_to_rect(item["box"])
-        cx_i, cy_i = rect_center(rect_i)
-        to_merge = [item]
+        groups = merge_groups(self.rects, threshold)
+        if len(groups) == len(self):
+            return self
         
-        for j in range(i + 1, len(items)):
-            if j in skip:
+        rects = self.rects
+        boxes = np.empty((len(groups), 4, 2), dtype=self.boxes.dtype)
+        confs = np.empty(len(groups), dtype=self.confs.dtype)
+        texts = []
+        for k, group in enumerate(groups):
+            if len(group) == 1:
+                i = group[0]
+                texts.append(self.texts[i])
+                boxes[k] = self.boxes[i]
+                confs[k] = self.confs[i]
                 continue
             
-            rect_j = box_to_rect(items[j]["box"])
-            cx_j, cy_j = rect_center(rect_j)
-            
-            if abs(cy_i - cy_j) < threshold / 2 and abs(cx_i - cx_j) < threshold * 2:
-                to_merge.append(items[j])
-                skip.add(j)
+            x1, y1 = rects[group, 0].min(), rects[group, 1].min()
+            x2, y2 = rects[group, 2].max(), rects[group, 3].max()
+            texts.append(" ".join([self.texts[j] for j in group]))
+            boxes[k] = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            confs[k] = self.confs[group].mean()
         
-        if len(to_merge) == 1:
-            merged.append(item)
-        else:
-            merged_text = " ".join([it["text"] for it in to_merge])
-            all_boxes = [box_to_rect(it["box"]) for it in to_merge]
-            
-            x1 = min([b[0] for b in all_boxes])
-            y1 = min([b[1] for b in all_boxes])
-            x2 = max([b[2] for b in all_boxes])
-            y2 = max([b[3] for b in all_boxes])
-            
-            merged_box = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
-            avg_conf = sum([it["conf"] for it in to_merge]) / len(to_merge)
-            
-            merged.append({
-                "text": merged_text,
-                "box": merged_box,
-                "conf": avg_conf
-            })
-    
-    return merged
+        return OCRPage(texts, boxes, confs)
+
+    def to_items(self):
+        """Per-item dicts for results.json"""
+        items = []
+        for idx, (text, box, conf) in enumerate(zip(self.texts, self.boxes.tolist(), self.confs.tolist()), start=1):
+            item = {"text": text, "box": [tuple(p) for p in box], "conf": conf, "index": idx}
+            if self.translations:
+                item["translation"] = self.translations[idx - 1]
+            items.append(item)
+        return items
 
 
 # ============================================================================
 # Translation
 # ============================================================================
 
+# Shared keep-alive session: retries and per-item calls reuse open connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0))
+
+
+@lru_cache(maxsize=4096)
+def _libre_cached(text, src, tgt):
+    """One LibreTranslate request; raises on failure so failures are never cached"""
+    url = "https://libretranslate.com/translate"
+    r = _SESSION.post(
+        url,
+        json={"q": text, "source": src, "target": tgt, "format": "text"},
+        headers={"Content-Type": "application/json"},
+        timeout=25
+    )
+    r.raise_for_status()
+    return r.json().get("translatedText", text)
+
+
 def translate_libre(text, src, tgt):
-    """Translate using LibreTranslate"""
+    """Translate using LibreTranslate (repeated texts are served from cache)"""
     try:
-        url = "https://libretranslate.com/translate"
-        r = requests.post(
-            url,
-            json={"q": text, "source": src, "target": tgt, "format": "text"},
-            headers={"Content-Type": "application/json"},
-            timeout=25
-        )
-        if r.ok:
-            return r.json().get("translatedText", text)
-        return text
+        return _libre_cached(text, src, tgt)
     except Exception:
         return text
 
@@ -201,6 +362,12 @@ def translate_openai_batch(texts, src, tgt, key, model, max_retries=5):
     if not key:
         return [f"[Missing OpenAI key] {t}" for t in texts]
 
+    # Repeated texts (SFX, names) are sent once and scattered back
+    unique = list(dict.fromkeys(texts))
+    if len(unique) < len(texts):
+        mapping = dict(zip(unique, translate_openai_batch(unique, src, tgt, key, model, max_retries)))
+        return [mapping[t] for t in texts]
+
     url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {key}",
@@ -226,20 +393,38 @@ def translate_openai_batch(texts, src, tgt, key, model, max_retries=5):
         },
         {
             "role": "user",
-            "content": json.dumps(user_payload, ensure_ascii=False)
+            "content": orjson.dumps(user_payload).decode("utf-8") if orjson else json.dumps(user_payload, ensure_ascii=False)
         },
     ]
 
+    # Request body is encoded once and reused by every retry
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.2,
+        # Structured output: a bare {"translations": [...]} object, no fences or extra text
+        # (models without structured outputs get one retry in plain JSON mode below)
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "translations",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {"translations": {"type": "array", "items": {"type": "string"}}},
+                    "required": ["translations"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+    }
+    body = orjson.dumps(payload) if orjson else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
     last_err = None
     
     for attempt in range(max_retries):
         try:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "temperature": 0.2
-            }
-            r = requests.post(url, headers=headers, json=payload, timeout=90)
+            r = _SESSION.post(url, headers=headers, data=body, timeout=90)
 
             # Handle 429 with exponential backoff
             if r.status_code == 429:
@@ -255,6 +440,13 @@ def translate_openai_batch(texts, src, tgt, key, model, max_retries=5):
                 time.sleep(sleep_s)
                 continue
 
+            if r.status_code == 400 and "response_format" in r.text and payload["response_format"]["type"] != "json_object":
+                last_err = f"{model} does not support json_schema, retrying in JSON mode"
+                print(f"[OpenAI] {last_err}")
+                payload["response_format"] = {"type": "json_object"}
+                body = orjson.dumps(payload) if orjson else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                continue
+
             if not r.ok:
                 last_err = f"OpenAI error {r.status_code}"
                 print(f"[OpenAI] {last_err}")
@@ -263,13 +455,13 @@ def translate_openai_batch(texts, src, tgt, key, model, max_retries=5):
             # Parse response
             content = r.json()["choices"][0]["message"]["content"].strip()
 
-            # Remove markdown fences
+            # Remove markdown fences (JSON mode has no schema guarantee)
             if content.startswith("```"):
                 content = content.strip("`")
                 if content.startswith("json"):
                     content = content[4:].strip()
 
-            data = json.loads(content)
+            data = orjson.loads(content) if orjson else json.loads(content)
             translations = data.get("translations")
             
             if not isinstance(translations, list) or len(translations) != len(texts):
@@ -287,28 +479,84 @@ def translate_openai_batch(texts, src, tgt, key, model, max_retries=5):
     return [f"{tag} {t}" for t in texts]
 
 
+def pack_chunks(texts, max_tokens=3000, max_items=100):
+    """
+    Split texts (in order) into chunks of ~max_tokens estimated tokens
+    (~1 per 3 UTF-8 bytes plus JSON overhead) and at most max_items texts each.
+    """
+    chunks, chunk, used = [], [], 0
+    for text in texts:
+        cost = len(text.encode("utf-8")) // 3 + 5
+        if chunk and (used + cost > max_tokens or len(chunk) >= max_items):
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append(text)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
 # ============================================================================
 # Drawing
 # ============================================================================
 
-def draw_numbered_boxes(img: Image.Image, items: List[Dict]) -> Image.Image:
-    """Draw numbered boxes on image"""
-    out = img.convert("RGB").copy()
-    draw = ImageDraw.Draw(out)
-    
+BOX_COLOR = (255, 0, 0)
+LABEL_TEXT_COLOR = (255, 255, 255)
+LABEL_FONT_PATH = "DejaVuSans.ttf"
+LABEL_FONT_SIZE = 22
+
+# Pixel value written by the NumPy box painter
+_BOX_RGB = np.array(BOX_COLOR, dtype=np.uint8)
+
+
+@lru_cache(maxsize=8)
+def _load_font(path: str = LABEL_FONT_PATH, size: int = LABEL_FONT_SIZE):
+    """Load a font once per (path, size) (TTF parsing is not free)"""
     try:
-        font = ImageFont.truetype("DejaVuSans.ttf", 22)
-    except Exception:
-        font = ImageFont.load_default()
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default()
+
 
-    for it in items:
-        i = it["index"]
-        box = it["box"]
-        x1, y1, x2, y2 = box_to_rect(box)
+def draw_numbered_boxes(img: Image.Image, page: OCRPage) -> Image.Image:
+    """
+    Draw numbered red boxes on image (numbers follow the page order, starting at 1).
+    Box outlines and label backgrounds are painted straight into a NumPy array:
+    all fill rectangles are computed and clipped in one vectorized pass, then
+    written with plain slice assignments. PIL is only used for the label digits.
+    """
+    arr = np.array(img.convert("RGB"))
+    h, w = arr.shape[:2]
+
+    rects = page.rects.tolist()
+    if rects:
+        # Same truncation PIL applies to float coordinates
+        x1, y1, x2, y2 = page.rects.astype(np.int64).T
+
+        # Five inclusive PIL-style rectangles per box: 3px border sides + label background
+        fills = np.stack([
+            np.stack([x1, y1, x2, np.minimum(y1 + 2, y2)], axis=1),
+            np.stack([x1, np.maximum(y2 - 2, y1), x2, y2], axis=1),
+            np.stack([x1, y1, np.minimum(x1 + 2, x2), y2], axis=1),
+            np.stack([np.maximum(x2 - 2, x1), y1, x2, y2], axis=1),
+            np.stack([x1, y1, x1 + 36, y1 + 30], axis=1),
+        ]).reshape(-1, 4)
+
+        # Half-open slice bounds, clipped to the image
+        fills[:, 2:] += 1
+        fills = np.clip(fills, 0, [w, h, w, h])
+
+        for x_lo, y_lo, x_hi, y_hi in fills.tolist():
+            arr[y_lo:y_hi, x_lo:x_hi] = _BOX_RGB
+
+    out = Image.fromarray(arr)
+    draw = ImageDraw.Draw(out)
+    font = _load_font()
 
-        draw.rectangle([x1, y1, x2, y2], outline=(255, 0, 0), width=3)
-        draw.rectangle([x1, y1, x1 + 36, y1 + 30], fill=(255, 0, 0))
-        draw.text((x1 + 7, y1 + 3), str(i), fill=(255, 255, 255), font=font)
+    # White number
+    for i, (x1, y1, _, _) in enumerate(rects, start=1):
+        draw.text((x1 + 7, y1 + 3), str(i), fill=LABEL_TEXT_COLOR, font=font)
 
     return out
 
@@ -317,24 +565,42 @@ def draw_numbered_boxes(img: Image.Image, items: List[Dict]) -> Image.Image:
 # Main
 # ============================================================================
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--image", required=True)
-    ap.add_argument("--ocr_lang", required=True)
-    ap.add_argument("--target_lang", required=True)
-    ap.add_argument("--backend", required=True)
+    ap.add_argument("--image")
+    ap.add_argument("--ocr_lang")
+    ap.add_argument("--target_lang")
+    ap.add_argument("--backend")
     ap.add_argument("--min_conf", type=float, default=0.35)
     ap.add_argument("--merge_lines", action="store_true")
+    ap.add_argument("--ocr_max_side", type=int, default=1600)
     ap.add_argument("--openai_key", default="")
     ap.add_argument("--openai_model", default="gpt-4o-mini")
-    args = ap.parse_args()
+    ap.add_argument("--serve", action="store_true",
+                    help="Run as a persistent HTTP server (readers stay loaded between pages)")
+    ap.add_argument("--port", type=int, default=8000)
+    return ap
+
 
+def process(args) -> None:
+    """Run OCR + translation for one page and write annotated.png / results.json / results.csv"""
     # Load image
     img = Image.open(args.image).convert("RGB")
-    img_np = np.array(img)
+
+    # Downscale large scans for OCR, boxes are mapped back with inv_scale
+    w, h = img.size
+    scale = min(1.0, args.ocr_max_side / float(max(w, h))) if args.ocr_max_side else 1.0
+    if scale < 1.0:
+        ocr_img = img.resize((max(1, int(w * scale)), max(1, int(h * scale))), Image.LANCZOS)
+        inv_scale = 1.0 / scale
+    else:
+        ocr_img = img
+        inv_scale = 1.0
+    # Read-only view of the pixels, shared by every OCR pass (no extra H*W*3 copy)
+    img_np = np.asarray(ocr_img)
 
     # OCR
-    print(f"Running OCR with language: {args.ocr_lang}")
+    print(f"Running OCR with language: {args.ocr_lang} (device: {detect_device()})")
     
     if args.ocr_lang == "auto":
         detected_lang, raw = run_ocr_auto(img_np)
@@ -345,44 +611,28 @@ def main():
         ocr_lang = args.ocr_lang
 
     # Process OCR results
-    items = []
-    for box, text, conf in raw:
-        t = (text or "").strip()
-        if not t or conf < args.min_conf:
-            continue
-        
-        items.append({
-            "text": t,
-            "box": [(float(p[0]), float(p[1])) for p in box],
-            "conf": float(conf)
-        })
+    page = OCRPage.from_raw(raw, args.min_conf, inv_scale)
 
-    print(f"Found {len(items)} text regions")
+    print(f"Found {len(page)} text regions")
 
     # Merge nearby boxes if requested
     if args.merge_lines:
-        items = merge_nearby_boxes(items)
-        print(f"After merging: {len(items)} text regions")
-
-    # Sort reading order
-    items = sort_reading_order(items)
+        page = page.merged()
+        print(f"After merging: {len(page)} text regions")
 
-    # Index them
-    for idx, it in enumerate(items, start=1):
-        it["index"] = idx
+    # Sort reading order (indices are the 1-based positions in this order)
+    page = page.sorted()
 
     # Translate (batched for OpenAI)
     print(f"Translating to {args.target_lang} using {args.backend}")
     
     if args.backend.startswith("OpenAI"):
-        # Batch all texts together
-        texts = [it["text"] for it in items]
-        batch_size = 18
+        # Batch texts together, packed by estimated tokens
+        chunks = pack_chunks(page.texts)
         
         all_translations = []
-        for i in range(0, len(texts), batch_size):
-            chunk = texts[i:i+batch_size]
-            print(f"Translating batch {i//batch_size + 1} ({len(chunk)} texts)...")
+        for n, chunk in enumerate(chunks):
+            print(f"Translating batch {n + 1}/{len(chunks)} ({len(chunk)} texts)...")
             
             translations = translate_openai_batch(
                 chunk,
@@ -393,39 +643,103 @@ def main():
             )
             all_translations.extend(translations)
         
-        # Attach translations
-        for it, tr in zip(items, all_translations):
-            it["translation"] = tr
+        page.translations = all_translations
     else:
-        # LibreTranslate (one-by-one)
-        for it in items:
-            it["translation"] = translate_libre(
-                it["text"],
-                ocr_lang,
-                args.target_lang
-            )
+        # LibreTranslate (one request per item, 8 in flight at once)
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            page.translations = list(ex.map(
+                lambda text: translate_libre(text, ocr_lang, args.target_lang),
+                page.texts
+            ))
 
     # Draw annotated image
-    annotated = draw_numbered_boxes(img, items)
+    annotated = draw_numbered_boxes(img, page)
     annotated.save("annotated.png", format="PNG")
     print("Saved annotated.png")
 
     # Export JSON
-    with open("results.json", "w", encoding="utf-8") as f:
-        json.dump({"items": items}, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        with open("results.json", "wb") as f:
+            f.write(orjson.dumps({"items": page.to_items()}, option=orjson.OPT_INDENT_2))
+    else:
+        with open("results.json", "w", encoding="utf-8") as f:
+            json.dump({"items": page.to_items()}, f, ensure_ascii=False, indent=2)
     print("Saved results.json")
 
-    # Export CSV
-    df = pd.DataFrame([{
-        "index": it["index"],
-        "text": it["text"],
-        "translation": it["translation"],
-        "conf": it["conf"],
-        "box": it["box"]
-    } for it in items])
-    df.to_csv("results.csv", index=False)
+    # Export CSV (rows streamed straight from the page arrays)
+    with open("results.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["index", "text", "translation", "conf", "box"])
+        for idx, (text, translation, conf, box) in enumerate(
+            zip(page.texts, page.translations, page.confs.tolist(), page.boxes.tolist()), start=1
+        ):
+            writer.writerow([idx, text, translation, conf, str([tuple(p) for p in box])])
     print("Saved results.csv")
 
 
+# ============================================================================
+# Persistent server mode
+# ============================================================================
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health  -> 200 once the server is up
+    POST /process -> JSON body with the same fields as the CLI flags
+    """
+
+    def _reply(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"ok": True})
+        else:
+            self._reply(404, {"ok": False, "error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/process":
+            self._reply(404, {"ok": False, "error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            options = json.loads(self.rfile.read(length) or b"{}")
+            args = build_parser().parse_args([])
+            for key, value in options.items():
+                setattr(args, key, value)
+            process(args)
+            self._reply(200, {"ok": True})
+        except Exception as e:
+            print(f"Processing failed: {e}")
+            self._reply(500, {"ok": False, "error": str(e)})
+
+
+def serve(port: int) -> None:
+    """Serve requests one at a time; EasyOCR readers stay cached in this process"""
+    server = HTTPServer(("127.0.0.1", port), WorkerHandler)
+    print(f"Sandbox worker listening on 127.0.0.1:{port}")
+    server.serve_forever()
+
+
+def main():
+    ap = build_parser()
+    args = ap.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    for name in ("image", "ocr_lang", "target_lang", "backend"):
+        if not getattr(args, name):
+            ap.error(f"--{name} is required")
+
+    process(args)
+
+
 if __name__ == "__main__":
     main()
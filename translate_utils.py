@@ -2,25 +2,74 @@
 Translation utilities with batched OpenAI to avoid 429 rate limits
 
 Fixed issues:
-1. Batched translation (18 texts per request) instead of 1-per-request
+1. Batched translation (texts packed by token estimate per request) instead of 1-per-request
 2. Exponential backoff with retries on 429 errors
 3. Proper JSON parsing with fallback handling
 4. Language detection using Unicode ranges
+5. Proactive token-bucket throttling (requests/min + tokens/min) before each call
 """
 from __future__ import annotations
 
 import json
 import random
+import re
+import threading
 import time
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson  # optional: much faster JSON encode/decode for CJK-heavy payloads
+except ImportError:
+    orjson = None
+
+try:
+    import tiktoken  # optional: exact token counts for chunk packing
+except ImportError:
+    tiktoken = None
+
+
+# ============================================================================
+# Shared HTTP session (keep-alive: no new TCP+TLS handshake per request)
+# ============================================================================
+
+# Pool sized for the concurrent OpenAI batches plus their LibreTranslate fallbacks
+HTTP_POOL_SIZE = 16
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0))
+
+
+def _json_dumps(data) -> str:
+    """Compact UTF-8 JSON (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _json_loads(content):
+    """Parse JSON from str/bytes (orjson when available; both raise json.JSONDecodeError)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
 
 
 # ============================================================================
 # Language Detection (Unicode-based heuristics)
 # ============================================================================
 
+# One precompiled character class per script: re scans in C and stops at the first hit
+_ARABIC_RE = re.compile("[\u0600-\u06FF\u0750-\u077F]")  # Arabic + Arabic Supplement
+_KANA_RE = re.compile("[\u3040-\u309F\u30A0-\u30FF]")  # Hiragana + Katakana
+_HANGUL_RE = re.compile("[\uAC00-\uD7AF]")  # Hangul syllables
+_CJK_RE = re.compile("[\u4E00-\u9FFF]")  # CJK Unified Ideographs
+_LATIN1_RE = re.compile("[\u00C0-\u00FF]")  # Latin-1 Supplement letters (é, è, à, ...)
+
+
 def detect_batch_language(items: List[Dict]) -> str:
     """
     Heuristic language detection based on Unicode ranges in the OCR text.
@@ -30,28 +79,25 @@ def detect_batch_language(items: List[Dict]) -> str:
     if not text:
         return "en"
 
-    def has_range(lo: int, hi: int) -> bool:
-        return any(lo <= ord(ch) <= hi for ch in text)
-
     # Arabic (0x0600-0x06FF, 0x0750-0x077F)
-    if has_range(0x0600, 0x06FF) or has_range(0x0750, 0x077F):
+    if _ARABIC_RE.search(text):
         return "ar"
 
     # Japanese Kana (Hiragana: 0x3040-0x309F, Katakana: 0x30A0-0x30FF)
-    if has_range(0x3040, 0x309F) or has_range(0x30A0, 0x30FF):
+    if _KANA_RE.search(text):
         return "ja"
 
     # Korean Hangul (0xAC00-0xD7AF)
-    if has_range(0xAC00, 0xD7AF):
+    if _HANGUL_RE.search(text):
         return "ko"
 
     # CJK Unified Ideographs (0x4E00-0x9FFF) - Chinese or Japanese Kanji
     # If no kana/hangul, assume Chinese
-    if has_range(0x4E00, 0x9FFF):
+    if _CJK_RE.search(text):
         return "ch_sim"
 
     # French detection (basic - looks for accented characters)
-    if has_range(0x00C0, 0x00FF):  # Latin-1 Supplement (includes é, è, à, etc.)
+    if _LATIN1_RE.search(text):
         return "fr"
 
     # Default: English
@@ -62,34 +108,219 @@ def detect_batch_language(items: List[Dict]) -> str:
 # LibreTranslate (free, single-request fallback)
 # ============================================================================
 
+# Max LibreTranslate requests in flight at once (public endpoint limits per IP)
+LIBRE_MAX_CONCURRENCY = 8
+
+# Max distinct (text, languages) translations remembered per backend
+TRANSLATION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=TRANSLATION_CACHE_SIZE)
+def _libre_cached(text: str, src: str, tgt: str) -> str:
+    """One LibreTranslate request; raises on failure so failures are never cached"""
+    url = "https://libretranslate.com/translate"
+    data = {"q": text, "source": src, "target": tgt, "format": "text"}
+    r = _SESSION.post(url, json=data, headers={"Content-Type": "application/json"}, timeout=25)
+    r.raise_for_status()
+    return r.json().get("translatedText", text)
+
+
 def translate_libre(text: str, src: str, tgt: str) -> str:
     """
     Translate using LibreTranslate (public endpoint).
-    May be unreliable or rate-limited.
+    May be unreliable or rate-limited. Repeated texts (SFX, names) are served from cache.
     """
     try:
-        url = "https://libretranslate.com/translate"
-        data = {"q": text, "source": src, "target": tgt, "format": "text"}
-        r = requests.post(url, json=data, headers={"Content-Type": "application/json"}, timeout=25)
-        if r.ok:
-            return r.json().get("translatedText", text)
-        return text
+        return _libre_cached(text, src, tgt)
     except Exception:
         return text
 
 
+# ============================================================================
+# Proactive rate limiting (token bucket)
+# ============================================================================
+
+# Defaults match OpenAI tier-1 limits for gpt-4o-mini
+OPENAI_REQUESTS_PER_MINUTE = 500
+OPENAI_TOKENS_PER_MINUTE = 200_000
+
+# Max OpenAI batches in flight at once
+OPENAI_MAX_CONCURRENCY = 8
+
+
+def _parse_reset(value: Optional[str]) -> float:
+    """Parse OpenAI reset durations like "1s", "6m0s", "20ms" into seconds"""
+    if not value:
+        return 0.0
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(num) * units[unit] for num, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value))
+
+
+class RateLimiter:
+    """
+    Token bucket for requests/min and tokens/min, shared by all OpenAI calls.
+    Waiting before a request is much cheaper than a 429 plus exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.rpm = float(requests_per_minute)
+        self.tpm = float(tokens_per_minute)
+        self._requests = self.rpm
+        self._tokens = self.tpm
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._last = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int) -> None:
+        """Block until one request with ~tokens tokens fits in the budget"""
+        tokens = min(float(tokens), self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._requests >= 1 and self._tokens >= tokens:
+                        self._requests -= 1
+                        self._tokens -= tokens
+                        return
+                    wait = max(
+                        (1 - self._requests) * 60.0 / self.rpm,
+                        (tokens - self._tokens) * 60.0 / self.tpm,
+                    )
+            time.sleep(min(max(wait, 0.01), 5.0))
+
+    def update_from_headers(self, headers) -> None:
+        """Sync with the server's view via x-ratelimit-* response headers"""
+        try:
+            rem_req = headers.get("x-ratelimit-remaining-requests")
+            rem_tok = headers.get("x-ratelimit-remaining-tokens")
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if rem_req is not None:
+                    self._requests = min(self._requests, float(rem_req))
+                    if float(rem_req) <= 0:
+                        reset = _parse_reset(headers.get("x-ratelimit-reset-requests"))
+                        self._blocked_until = max(self._blocked_until, now + reset)
+                if rem_tok is not None:
+                    self._tokens = min(self._tokens, float(rem_tok))
+                    if float(rem_tok) <= 0:
+                        reset = _parse_reset(headers.get("x-ratelimit-reset-tokens"))
+                        self._blocked_until = max(self._blocked_until, now + reset)
+        except (TypeError, ValueError):
+            pass
+
+
+_openai_limiter = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+
+
 # ============================================================================
 # OpenAI Chat Completions (batched with retries)
 # ============================================================================
 
-def _openai_chat_completions(
-    api_key: str,
-    model: str,
-    messages: List[Dict],
-    timeout_s: int = 90,
-) -> requests.Response:
-    """Make OpenAI chat completion request"""
-    url = "https://api.openai.com/v1/chat/completions"
+def _build_messages(texts: List[str], src: str, tgt: str) -> List[Dict]:
+    """Build the strict JSON-only translation prompt for one batch of texts"""
+    # Normalize language codes for better prompt clarity
+    lang_map = {
+        "ch_sim": "zh",
+        "ch_tra": "zh",
+        "zh_sim": "zh",
+        "zh_tra": "zh",
+    }
+    src = lang_map.get(src, src)
+    tgt = lang_map.get(tgt, tgt)
+
+    # Build strict JSON-only prompt
+    user_payload = {
+        "source_language": src,
+        "target_language": tgt,
+        "segments": texts,
+        "instructions": "Return ONLY valid JSON with key 'translations' (array of strings), same length as segments. No extra text."
+    }
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a precise translator. Output strictly as JSON only, no markdown, no explanations."
+        },
+        {
+            "role": "user",
+            "content": _json_dumps(user_payload)
+        },
+    ]
+
+
+# Structured output schema: the API guarantees a bare JSON object of this shape
+# (no markdown fences, no extra text). Array length is still checked locally.
+TRANSLATIONS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "translations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "translations": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["translations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+# Fallback for models without structured outputs (they answer 400 to json_schema):
+# plain JSON mode, no schema guarantee
+JSON_OBJECT_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Models that rejected json_schema once; later requests go straight to JSON mode
+_json_object_models = set()
+
+
+def _response_format_for(model: str) -> Dict:
+    """Strict schema unless the model is known not to support it"""
+    return JSON_OBJECT_RESPONSE_FORMAT if model in _json_object_models else TRANSLATIONS_RESPONSE_FORMAT
+
+
+def _parse_translations(content: str, texts: List[str]) -> List[str]:
+    """
+    Parse the model's JSON reply into a list of translations (same length as texts).
+    Raises json.JSONDecodeError / ValueError on malformed output.
+    """
+    content = content.strip()
+
+    # Remove markdown code fences if present (JSON mode has no schema guarantee)
+    if content.startswith("```"):
+        content = content.strip("`")
+        if content.startswith("json"):
+            content = content[4:].strip()
+
+    data = _json_loads(content)
+    translations = data.get("translations")
+    
+    # Validate
+    if not isinstance(translations, list) or len(translations) != len(texts):
+        raise ValueError(f"Bad JSON shape: expected list of {len(texts)}")
+    
+    # Ensure all are strings
+    return [str(t) if t is not None else texts[i] for i, t in enumerate(translations)]
+
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+
+def _openai_chat_request(api_key: str, model: str, messages: List[Dict], response_format: Dict):
+    """
+    Build the OpenAI chat completion request once per batch.
+    Returns (headers, body) - body is the UTF-8 encoded JSON payload, reused by every retry.
+    """
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
@@ -98,8 +329,72 @@ def _openai_chat_completions(
         "model": model,
         "messages": messages,
         "temperature": 0.2,
+        "response_format": response_format,
+        "stream": True,
     }
-    return requests.post(url, headers=headers, json=payload, timeout=timeout_s)
+    return headers, _json_dumps(payload).encode("utf-8")
+
+
+class _TranslationStreamParser:
+    """
+    Incremental scanner for a streamed {"translations": [...]} reply:
+    calls on_item(i, text) as soon as the i-th array string is complete.
+    """
+
+    def __init__(self, on_item: Callable[[int, str], None]):
+        self.on_item = on_item
+        self._in_array = False
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+        self._count = 0
+
+    def feed(self, chunk: str) -> None:
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._in_array:
+                        self.on_item(self._count, json.loads('"' + "".join(self._buf) + '"'))
+                        self._count += 1
+                    continue
+                self._buf.append(ch)
+            elif ch == '"':
+                self._in_string = True
+                self._buf = []
+            elif ch == "[":
+                self._in_array = True
+            elif ch == "]":
+                self._in_array = False
+
+
+def _read_stream(r: requests.Response, on_item: Optional[Callable[[int, str], None]] = None) -> str:
+    """Collect the message content of a streamed (server-sent events) chat completion"""
+    parser = _TranslationStreamParser(on_item) if on_item else None
+    parts = []
+    for line in r.iter_lines():
+        if not line.startswith(b"data: "):
+            continue
+        data = line[6:].strip()
+        if data == b"[DONE]":
+            # Keep reading to the end of the body so the connection goes back to the pool
+            continue
+        choices = _json_loads(data).get("choices") or []
+        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+        if delta:
+            parts.append(delta)
+            if parser is not None:
+                parser.feed(delta)
+    return "".join(parts)
+
+
+# Successful OpenAI translations keyed on (text, src, tgt, model), oldest evicted first
+_openai_cache: Dict[tuple, str] = {}
+_openai_cache_lock = threading.Lock()
 
 
 def translate_openai_batch(
@@ -109,6 +404,7 @@ def translate_openai_batch(
     api_key: str,
     model: str = "gpt-4o-mini",
     max_retries: int = 5,
+    on_translation: Optional[Callable[[str, str], None]] = None,
 ) -> List[str]:
     """
     Translate a batch of texts with ONE OpenAI request.
@@ -117,93 +413,119 @@ def translate_openai_batch(
     - Before: N requests for N texts = high 429 probability
     - After: 1 request for N texts = much lower 429 probability
     
+    Repeated texts (SFX, names) are sent once per request, and texts already
+    translated by an earlier request are reused without being sent again.
+    
+    The reply is streamed: on_translation(text, translation), if given, is called
+    as soon as each translation has arrived (provisional - a retried request
+    reports again; the return value is authoritative).
+    
     Returns: List of translations (same length as input)
     """
     if not api_key:
         return [f"[Missing OpenAI key] {t}" for t in texts]
 
-    # Normalize language codes for better prompt clarity
-    lang_map = {
-        "ch_sim": "zh",
-        "ch_tra": "zh",
-        "zh_sim": "zh",
-        "zh_tra": "zh",
-    }
-    src = lang_map.get(src, src)
-    tgt = lang_map.get(tgt, tgt)
+    done = {}
+    with _openai_cache_lock:
+        for t in texts:
+            hit = _openai_cache.get((t, src, tgt, model))
+            if hit is not None:
+                done[t] = hit
+    if on_translation is not None:
+        for t, translation in done.items():
+            on_translation(t, translation)
+
+    pending = [t for t in dict.fromkeys(texts) if t not in done]
+    if pending:
+        translations = _openai_request(pending, src, tgt, api_key, model, max_retries, on_translation)
+        with _openai_cache_lock:
+            for t, translation in zip(pending, translations):
+                done[t] = translation
+                if translation.startswith("[OpenAI failed"):
+                    continue
+                if len(_openai_cache) >= TRANSLATION_CACHE_SIZE:
+                    _openai_cache.pop(next(iter(_openai_cache)))
+                _openai_cache[(t, src, tgt, model)] = translation
+
+    return [done[t] for t in texts]
+
+
+def _openai_request(
+    texts: List[str],
+    src: str,
+    tgt: str,
+    api_key: str,
+    model: str,
+    max_retries: int,
+    on_translation: Optional[Callable[[str, str], None]] = None,
+) -> List[str]:
+    """One streamed chat completion for texts, with throttling and 429 retries (see translate_openai_batch)"""
+    messages = _build_messages(texts, src, tgt)
+    response_format = _response_format_for(model)
+    headers, body = _openai_chat_request(api_key, model, messages, response_format)
 
-    # Build strict JSON-only prompt
-    user_payload = {
-        "source_language": src,
-        "target_language": tgt,
-        "segments": texts,
-        "instructions": "Return ONLY valid JSON with key 'translations' (array of strings), same length as segments. No extra text."
-    }
+    def _report(i: int, translation: str) -> None:
+        if i < len(texts):
+            on_translation(texts[i], translation)
 
-    messages = [
-        {
-            "role": "system",
-            "content": "You are a precise translator. Output strictly as JSON only, no markdown, no explanations."
-        },
-        {
-            "role": "user",
-            "content": json.dumps(user_payload, ensure_ascii=False)
-        },
-    ]
+    on_item = _report if on_translation is not None else None
+
+    # Rate-limit budget from the same estimate _pack_chunks uses: the segments
+    # plus the fixed prompt, and about as many tokens again for the translations
+    segment_tokens = sum(_estimate_tokens(t, model) for t in texts)
+    est_tokens = _PROMPT_OVERHEAD_TOKENS + 2 * segment_tokens
 
     last_err = None
     
     for attempt in range(max_retries):
         try:
-            r = _openai_chat_completions(api_key, model, messages, timeout_s=90)
-            
-            # Handle 429 rate limit with exponential backoff (and detect quota errors)
-            if r.status_code == 429:
-                # Check for quota issues
-                try:
-                    err = r.json().get("error", {}) if r.content else {}
-                    if "insufficient_quota" in str(err):
-                        last_err = "insufficient_quota"
-                        break
-                except Exception:
-                    pass
-
-                retry_after = r.headers.get("Retry-After")
-                if retry_after and retry_after.isdigit():
-                    sleep_s = int(retry_after)
+            _openai_limiter.acquire(est_tokens)
+            # Context manager: the streamed connection is released to the pool on every path
+            with _SESSION.post(OPENAI_CHAT_URL, headers=headers, data=body, timeout=90, stream=True) as r:
+                _openai_limiter.update_from_headers(r.headers)
+                
+                # Handle 429 rate limit with exponential backoff (and detect quota errors)
+                if r.status_code == 429:
+                    # Check for quota issues
+                    try:
+                        err = r.json().get("error", {}) if r.content else {}
+                        if "insufficient_quota" in str(err):
+                            last_err = "insufficient_quota"
+                            break
+                    except Exception:
+                        pass
+
+                    retry_after = r.headers.get("Retry-After")
+                    if retry_after and retry_after.isdigit():
+                        sleep_s = int(retry_after)
+                    else:
+                        sleep_s = (2 ** attempt) + (random.random() * 1.5)
+
+                    sleep_s = min(45, sleep_s)
+                    last_err = f"429 rate limit (attempt {attempt+1}/{max_retries}), waiting {sleep_s:.1f}s"
+                
+                elif r.status_code == 400 and "response_format" in r.text and response_format is not JSON_OBJECT_RESPONSE_FORMAT:
+                    # Model without structured outputs: retry once in plain JSON mode
+                    last_err = f"{model} does not support json_schema, retrying in JSON mode"
+                    print(f"[OpenAI] {last_err}")
+                    _json_object_models.add(model)
+                    response_format = JSON_OBJECT_RESPONSE_FORMAT
+                    headers, body = _openai_chat_request(api_key, model, messages, response_format)
+                    continue
+
+                elif not r.ok:
+                    last_err = f"OpenAI error {r.status_code}: {r.text[:200]}"
+                    print(f"[OpenAI] {last_err}")
+                    break
+
                 else:
-                    sleep_s = (2 ** attempt) + (random.random() * 1.5)
+                    # Parse response (streamed; translations are reported as they complete)
+                    content = _read_stream(r, on_item)
+                    return _parse_translations(content, texts)
 
-                sleep_s = min(45, sleep_s)
-                last_err = f"429 rate limit (attempt {attempt+1}/{max_retries}), waiting {sleep_s:.1f}s"
-                print(f"[OpenAI] {last_err}")
-                time.sleep(sleep_s)
-                continue
-            
-            if not r.ok:
-                last_err = f"OpenAI error {r.status_code}: {r.text[:200]}"
-                print(f"[OpenAI] {last_err}")
-                break
-
-            # Parse response
-            content = r.json()["choices"][0]["message"]["content"].strip()
-
-            # Remove markdown code fences if present
-            if content.startswith("```"):
-                content = content.strip("`")
-                if content.startswith("json"):
-                    content = content[4:].strip()
-
-            # Parse JSON
-            data = json.loads(content)
-            translations = data.get("translations")
-            
-            # Validate
-            if not isinstance(translations, list) or len(translations) != len(texts):
-                raise ValueError(f"Bad JSON shape: expected list of {len(texts)}")
-            
-            # Ensure all are strings
-            return [str(t) if t is not None else texts[i] for i, t in enumerate(translations)]
+            # 429: back off after the connection has been released
+            print(f"[OpenAI] {last_err}")
+            time.sleep(sleep_s)
 
         except json.JSONDecodeError as e:
             last_err = f"JSON parse error: {e}"
@@ -225,6 +547,78 @@ def translate_openai_batch(
 # Main Translation Function (with batching)
 # ============================================================================
 
+# Chunk packing: target prompt tokens per OpenAI request, and a cap on segments
+# so a page of short SFX still splits into a few concurrent requests
+OPENAI_BATCH_TOKENS = 3000
+OPENAI_BATCH_MAX_ITEMS = 100
+
+# JSON quoting/separators around each segment (in the prompt and in the reply)
+_SEGMENT_OVERHEAD_TOKENS = 4
+
+# System prompt, instructions and JSON keys around the segments of one request
+_PROMPT_OVERHEAD_TOKENS = 120
+
+
+@lru_cache(maxsize=8)
+def _token_encoder(model: str):
+    """tiktoken encoding for model (None when tiktoken is missing or the model is unknown)"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return None
+
+
+def _estimate_tokens(text: str, model: str) -> int:
+    """Token count of one segment (tiktoken if available, else ~1 per 3 UTF-8 bytes)"""
+    enc = _token_encoder(model)
+    if enc is not None:
+        return len(enc.encode(text)) + _SEGMENT_OVERHEAD_TOKENS
+    # CJK is 3 bytes and ~1 token per char; Latin text is ~3-4 chars per token
+    return len(text.encode("utf-8")) // 3 + 1 + _SEGMENT_OVERHEAD_TOKENS
+
+
+def _pack_chunks(
+    texts: List[str],
+    model: str,
+    max_tokens: int = OPENAI_BATCH_TOKENS,
+    max_items: int = OPENAI_BATCH_MAX_ITEMS,
+) -> List[List[str]]:
+    """
+    Split texts (in order) into chunks of up to max_tokens estimated tokens and
+    max_items segments each. A single oversized text still gets its own chunk.
+    """
+    chunks: List[List[str]] = []
+    chunk: List[str] = []
+    used = 0
+    for text in texts:
+        cost = _estimate_tokens(text, model)
+        if chunk and (used + cost > max_tokens or len(chunk) >= max_items):
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append(text)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _with_libre_fallback(chunk: List[str], results: List[str], src: str, tgt: str) -> List[str]:
+    """Replace failed OpenAI results with a LibreTranslate attempt"""
+    out = []
+    for original, result in zip(chunk, results):
+        if result.startswith("[OpenAI failed"):
+            try:
+                # Attempt fallback (LibreTranslate)
+                out.append(translate_libre(original, src=src, tgt=tgt))
+            except Exception:
+                out.append(result)
+        else:
+            out.append(result)
+    return out
+
+
 def translate_batch(
     items: List[Dict],
     ocr_lang: str,
@@ -232,15 +626,21 @@ def translate_batch(
     backend: str,
     openai_key: str = "",
     openai_model: str = "gpt-4o-mini",
-    batch_size: int = 18,
+    batch_size: int = OPENAI_BATCH_MAX_ITEMS,
+    batch_tokens: int = OPENAI_BATCH_TOKENS,
+    on_translation: Optional[Callable[[str, str], None]] = None,
 ) -> List[Dict]:
     """
     Translate OCR items using selected backend.
     
-    For OpenAI: Translates in batches of ~18 to:
-    - Reduce total API calls
+    For OpenAI: Packs texts into batches of ~batch_tokens prompt tokens
+    (at most batch_size texts each) to:
+    - Reduce total API calls (short SFX share one request)
     - Avoid 429 rate limits
-    - Stay within reasonable token limits
+    - Stay within reasonable token limits (long paragraphs get smaller batches)
+    Batches are sent concurrently (bounded by OPENAI_MAX_CONCURRENCY).
+    on_translation(text, translation) reports streamed OpenAI results early
+    (called from worker threads).
     """
     if not items:
         return items
@@ -250,34 +650,28 @@ def translate_batch(
     # OpenAI (Batched)
     if backend.startswith("OpenAI"):
         translated_texts: List[str] = []
-        
-        # Process in batches to reduce API calls
-        for i in range(0, len(texts), batch_size):
-            chunk = texts[i : i + batch_size]
-            print(f"[OpenAI] Translating batch {i//batch_size + 1} ({len(chunk)} items)...")
-            
+        chunks = _pack_chunks(texts, openai_model, batch_tokens, batch_size)
+
+        def _translate_chunk(n: int) -> List[str]:
+            chunk = chunks[n]
+            print(f"[OpenAI] Translating batch {n + 1}/{len(chunks)} ({len(chunk)} items)...")
             chunk_results = translate_openai_batch(
                 chunk,
                 ocr_lang,
                 target_lang,
                 api_key=openai_key,
                 model=openai_model,
+                on_translation=on_translation,
             )
-            
-            # Per-item fallback check
-            for original, result in zip(chunk, chunk_results):
-                if result.startswith("[OpenAI failed"):
-                    try:
-                        # Attempt fallback (LibreTranslate)
-                        fallback = translate_libre(original, src=ocr_lang, tgt=target_lang)
-                        translated_texts.append(fallback)
-                    except Exception:
-                        translated_texts.append(result)
-                else:
-                    translated_texts.append(result)
 
-            # Small pacing
-            time.sleep(0.5)
+            # Per-item fallback (runs inside the task so fallbacks overlap too)
+            return _with_libre_fallback(chunk, chunk_results, ocr_lang, target_lang)
+
+        # Requests are I/O-bound: run all batches at once (bounded). The shared
+        # rate limiter paces them, so no extra sleep between batches is needed.
+        with ThreadPoolExecutor(max_workers=min(OPENAI_MAX_CONCURRENCY, len(chunks))) as ex:
+            for chunk_results in ex.map(_translate_chunk, range(len(chunks))):
+                translated_texts.extend(chunk_results)
 
         for i, item in enumerate(items):
             item["translation"] = translated_texts[i] if i < len(translated_texts) else item.get("text", "")
@@ -285,8 +679,9 @@ def translate_batch(
         return items
         
     else:
-        # LibreTranslate (one-by-one)
-        for item in items:
-            t = (item.get("text") or "").strip()
-            item["translation"] = translate_libre(t, src=ocr_lang, tgt=target_lang)
+        # LibreTranslate (one request per item, several in flight at once)
+        with ThreadPoolExecutor(max_workers=min(LIBRE_MAX_CONCURRENCY, len(texts))) as ex:
+            results = list(ex.map(lambda t: translate_libre(t, src=ocr_lang, tgt=target_lang), texts))
+        for item, translation in zip(items, results):
+            item["translation"] = translation
         return items